@@ -1,266 +1,439 @@
+import csv
 import sqlite3
 import logging
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
 import hashlib
-import json
 
 logger = logging.getLogger(__name__)
 
+# Fixed field order for generate_data_hash
+_HASH_FIELDS = (
+    'vendor_code', 'sku', 'name', 'description', 'price_retail', 'price_medium',
+    'price_large', 'image_url', 'rating', 'availability', 'delivery_info',
+)
+
+# Scraped products joined with their URLs, shared by the CSV and Parquet exports
+_EXPORT_QUERY = '''
+    SELECT u.id, u.url, p.product_name, p.vendor_code, p.vendor_product_sku,
+           p.vendor_price, p.vendor_price2, p.vendor_price3, p.vendor_img,
+           p.prod_description, u.last_crawl_time, p.updated_at
+    FROM vendor_product_management p
+    JOIN vendor_country_url_msts u ON u.id = p.pid
+    ORDER BY u.id
+'''
+
+# Bump SCHEMA_VERSION and extend Database._migration_script when the schema changes
+SCHEMA_VERSION = 1
+
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS vendor_country_url_msts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vid INTEGER DEFAULT 1,
+    cid INTEGER DEFAULT 1,
+    status TEXT DEFAULT 'active',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    url TEXT UNIQUE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_crawl_time TIMESTAMP,
+    cron_run_at TIMESTAMP,
+    currency_conv TEXT,
+    cron_status INTEGER DEFAULT 0,
+    cron_run_status TEXT DEFAULT 'inactive',
+    prod_cnt TEXT,
+    "from" TEXT,
+    "start of the counter" TEXT,
+    totcnt TEXT,
+    "Total Num" TEXT
+);
+-- Covers iter_pending_products: filter on status, read url (id is the rowid)
+CREATE INDEX IF NOT EXISTS idx_vcum_status_url ON vendor_country_url_msts(status, url);
+
+CREATE TABLE IF NOT EXISTS vendor_product_management (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pid TEXT,
+    fg_vendor_price TEXT,
+    cid INTEGER DEFAULT 1,
+    vid INTEGER DEFAULT 1,
+    vendor_price TEXT,
+    product_name TEXT,
+    vendor_code TEXT,
+    vendor_product_sku TEXT,
+    vendor_img TEXT,
+    vendor_product_url TEXT,
+    prod_description TEXT,
+    vendor_price2 TEXT,
+    vendor_price3 TEXT,
+    vendor_price1_desc TEXT,
+    vendor_price2_desc TEXT,
+    vendor_price3_desc TEXT,
+    action TEXT,
+    flag TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_hash TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vpm_pid ON vendor_product_management(pid);
+
+CREATE TABLE IF NOT EXISTS scrape_errors (
+    error_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER,
+    product_url TEXT,
+    error_type TEXT,
+    error_message TEXT,
+    retry_count INTEGER DEFAULT 0,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_err_type ON scrape_errors(error_type);
+'''
+
+# Seconds a connection waits on a locked database; long enough to ride out a batch flush
+BUSY_TIMEOUT = 30
+
+# Product writes between PRAGMA optimize runs during long scrapes
+OPTIMIZE_EVERY = 1000
+
 class Database:
     """Handle all database operations for scraping."""
 
-    def __init__(self, db_path: str = 'prestige_flowers_v3.db'):
+    def __init__(self, db_path: str = 'prestige_flowers_v3.db', readers: int = 4, batch_size: int = 50):
         self.db_path = db_path
+        self.batch_size = batch_size
+        self._details_buf = []
+        self._touched = []
+        self._errors_buf = []
+        self._written_since_optimize = 0
+        # Single writer connection for the life of the process; autocommit mode
+        # with explicit transactions where several statements must land together.
+        self.writer = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
         self.init_database()
 
+        # Read-only connections so lookups don't queue behind the writer lock
+        self.readers = queue.Queue()
+        reader_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(readers):
+            conn = sqlite3.connect(reader_uri, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+            self._apply_pragmas(conn)
+            self.readers.put(conn)
+
+    def _apply_pragmas(self, conn: sqlite3.Connection) -> None:
+        """Apply per-connection cache/sync tuning to a new connection."""
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-65536')  # 64MB page cache
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}')  # Match the connect() timeout
+
+    @contextmanager
+    def _read(self):
+        """Borrow a reader connection and yield a cursor on it."""
+        conn = self.readers.get()
+        try:
+            yield conn.cursor()
+        finally:
+            self.readers.put(conn)
+
+    @contextmanager
+    def _transaction(self):
+        """Run a block of writes inside one explicit transaction."""
+        with self._lock:
+            cursor = self.writer.cursor()
+            # Take the write lock upfront rather than upgrading mid-transaction
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            else:
+                cursor.execute('COMMIT')
+
+    def optimize(self) -> None:
+        """Fold the WAL back into the database and refresh planner statistics."""
+        with self._lock:
+            self.writer.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.writer.execute('PRAGMA optimize')
+        self._written_since_optimize = 0
+
+    def close(self) -> None:
+        """Close the writer and all reader connections."""
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+        self.writer.close()
+
     def init_database(self) -> None:
         """Initialize SQLite database with tables."""
-        conn = sqlite3.connect(self.db_path, timeout=10)
-        cursor = conn.cursor()
-
-        # Drop old tables if exist
-        cursor.execute('DROP TABLE IF EXISTS products')
-        cursor.execute('DROP TABLE IF EXISTS product_details')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vendor_country_url_msts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                vid INTEGER DEFAULT 1,
-                cid INTEGER DEFAULT 1,
-                status TEXT DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                url TEXT UNIQUE NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_crawl_time TIMESTAMP,
-                cron_run_at TIMESTAMP,
-                currency_conv TEXT,
-                cron_status INTEGER DEFAULT 0,
-                cron_run_status TEXT DEFAULT 'inactive',
-                prod_cnt TEXT,
-                "from" TEXT,
-                "start of the counter" TEXT,
-                totcnt TEXT,
-                "Total Num" TEXT
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vendor_product_management (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pid TEXT,
-                fg_vendor_price TEXT,
-                cid INTEGER DEFAULT 1,
-                vid INTEGER DEFAULT 1,
-                vendor_price TEXT,
-                product_name TEXT,
-                vendor_code TEXT,
-                vendor_product_sku TEXT,
-                vendor_img TEXT,
-                vendor_product_url TEXT,
-                prod_description TEXT,
-                vendor_price2 TEXT,
-                vendor_price3 TEXT,
-                vendor_price1_desc TEXT,
-                vendor_price2_desc TEXT,
-                vendor_price3_desc TEXT,
-                action TEXT,
-                flag TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scrape_errors (
-                error_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER,
-                product_url TEXT,
-                error_type TEXT,
-                error_message TEXT,
-                retry_count INTEGER DEFAULT 0,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        # WAL is stored in the database file, so it only needs setting once
+        self.writer.execute('PRAGMA journal_mode=WAL')
+        self._apply_pragmas(self.writer)
+        with self._lock:
+            version = self.writer.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                # executescript commits any open transaction first, so the script carries its own
+                try:
+                    self.writer.executescript(
+                        f'BEGIN IMMEDIATE;\n{self._migration_script(version)}\n'
+                        f'PRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;'
+                    )
+                except Exception:
+                    if self.writer.in_transaction:
+                        self.writer.execute('ROLLBACK')
+                    raise
+                logger.info(f"Migrated database schema from version {version} to {SCHEMA_VERSION}")
         logger.info(f"✅ Database initialized: {self.db_path}")
 
+    def _migration_script(self, version: int) -> str:
+        """Build the DDL that brings a database at the given user_version up to date."""
+        statements = []
+        if version < 1:
+            # Unversioned databases may predate the data_hash column
+            columns = {row[1] for row in self.writer.execute('PRAGMA table_info(vendor_product_management)')}
+            if columns and 'data_hash' not in columns:
+                statements.append('ALTER TABLE vendor_product_management ADD COLUMN data_hash TEXT;')
+        statements.append(SCHEMA_SQL)
+        return '\n'.join(statements)
+
     def save_product_url(self, url: str) -> None:
         """Save a product URL if not exists."""
-        conn = sqlite3.connect(self.db_path, timeout=10)
-        cursor = conn.cursor()
+        self.save_product_urls([url])
+
+    def save_product_urls(self, urls: Iterable[str]) -> dict:
+        """Save many product URLs in one transaction, skipping existing ones."""
+        rows = [(url,) for url in urls]
+        counts = {'inserted': 0, 'skipped': 0}
         try:
-            cursor.execute('INSERT OR IGNORE INTO vendor_country_url_msts (url, status) VALUES (?, ?)', (url, 'active'))
-            conn.commit()
+            with self._transaction() as cursor:
+                before = self.writer.total_changes
+                cursor.executemany("INSERT OR IGNORE INTO vendor_country_url_msts (url, status) VALUES (?, 'active')", rows)
+                inserted = self.writer.total_changes - before
+            counts = {'inserted': inserted, 'skipped': len(rows) - inserted}
         except Exception as e:
-            logger.error(f"Error saving URL {url}: {e}")
-        finally:
-            conn.close()
-
-    def get_pending_products(self, limit: int = None) -> list:
-        """Get pending products."""
-        conn = sqlite3.connect(self.db_path, timeout=10)
-        cursor = conn.cursor()
-        if limit:
-            cursor.execute('SELECT id, url FROM vendor_country_url_msts WHERE status = "active" LIMIT ?', (limit,))
-        else:
-            cursor.execute('SELECT id, url FROM vendor_country_url_msts WHERE status = "active"')
-        products = cursor.fetchall()
-        conn.close()
-        return products
-
-    def get_existing_product_details(self, product_id: int) -> dict:
-        """Get existing product details for comparison."""
-        conn = sqlite3.connect(self.db_path, timeout=10)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM vendor_product_management WHERE pid = ?', (product_id,))
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            return {
-                'id': row[0],
-                'pid': row[1],
-                'fg_vendor_price': row[2],
-                'cid': row[3],
-                'vid': row[4],
-                'vendor_price': row[5],
-                'product_name': row[6],
-                'vendor_code': row[7],
-                'vendor_product_sku': row[8],
-                'vendor_img': row[9],
-                'vendor_product_url': row[10],
-                'prod_description': row[11],
-                'vendor_price2': row[12],
-                'vendor_price3': row[13],
-                'vendor_price1_desc': row[14],
-                'vendor_price2_desc': row[15],
-                'vendor_price3_desc': row[16],
-                'action': row[17],
-                'flag': row[18],
-                'created_at': row[19],
-                'updated_at': row[20],
-                # Map to old keys for compatibility
-                'vendor_code': row[7],
-                'sku': row[8],
-                'name': row[6],
-                'description': row[11],
-                'price_retail': row[5],
-                'price_medium': row[12],
-                'price_large': row[13],
-                'image_url': row[9],
-                'product_url': row[10],
-                'rating': None,
-                'availability': None,
-                'delivery_info': None,
-                'structured_json': None,
-                'data_hash': None
-            }
-        return None
+            logger.error(f"Error saving URLs: {e}")
+        return counts
+
+    def reactivate_stale(self, max_age: int) -> int:
+        """Mark products last crawled more than max_age seconds ago as pending again."""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "UPDATE vendor_country_url_msts SET status = 'active' "
+                    "WHERE status = 'inactive' AND (last_crawl_time IS NULL OR last_crawl_time < datetime('now', ?))",
+                    (f'-{max_age} seconds',)
+                )
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error reactivating stale products: {e}")
+            return 0
+
+    def count_pending(self, limit: int = None) -> int:
+        """Count pending products, capped at limit."""
+        with self._read() as cursor:
+            count = cursor.execute("SELECT COUNT(*) FROM vendor_country_url_msts WHERE status = 'active'").fetchone()[0]
+        return min(count, limit) if limit else count
+
+    def iter_pending_products(self, limit: int = None) -> Iterator[tuple]:
+        """Yield pending (id, url) rows straight from the cursor."""
+        with self._read() as cursor:
+            # LIMIT -1 means no limit in SQLite
+            cursor.execute("SELECT id, url FROM vendor_country_url_msts WHERE status = 'active' LIMIT ?", (limit or -1,))
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                yield from rows
 
     def generate_data_hash(self, details: dict) -> str:
         """Generate a hash of key product details to detect changes."""
-        key_data = {
-            'vendor_code': details.get('vendor_code', ''),
-            'sku': details.get('sku', ''),
-            'name': details.get('name', ''),
-            'description': details.get('description', ''),
-            'price_retail': details.get('price_retail'),
-            'price_medium': details.get('price_medium'),
-            'price_large': details.get('price_large'),
-            'image_url': details.get('image_url', ''),
-            'rating': details.get('rating'),
-            'availability': details.get('availability', ''),
-            'delivery_info': details.get('delivery_info', '')
-        }
-        data_str = json.dumps(key_data, sort_keys=True, default=str)
-        return hashlib.md5(data_str.encode()).hexdigest()
-
-    def save_product_details(self, product_id: int, product_url: str, details: dict) -> tuple:
-        """Save or update product details, returning (is_inserted, has_changed)."""
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
-            cursor = conn.cursor()
+        h = hashlib.blake2b(digest_size=16)
+        for key in _HASH_FIELDS:
+            h.update(b'\x1f')
+            h.update(str(details.get(key)).encode('utf-8'))
+        return h.hexdigest()
+
+    def save_product_details(self, product_id: int, product_url: str, details: dict) -> None:
+        """Buffer product details, flushing once a full batch has accumulated."""
+        # Only the column values are kept; the JSON-LD payload isn't stored
+        self._details_buf.append((
+            product_id,
+            '',
+            1,
+            1,
+            details.get('price_retail'),
+            details.get('name'),
+            details.get('vendor_code'),
+            details.get('sku'),
+            details.get('image_url'),
+            product_url,
+            details.get('description'),
+            details.get('price_medium'),
+            details.get('price_large'),
+            'Retail',
+            'Medium',
+            'Large',
+            '',
+            '',
+            self.generate_data_hash(details)
+        ))
+        if len(self._details_buf) >= self.batch_size:
+            self.flush_pending_details()
+
+    def flush_pending_details(self) -> dict:
+        """Write buffered crawl stamps and product details in a single transaction."""
+        rows, self._details_buf = self._details_buf, []
+        touched, self._touched = self._touched, []
+        counts = {'written': 0, 'unchanged': 0}
+        if not rows and not touched:
+            return counts
 
-            existing = self.get_existing_product_details(product_id)
+        # A product scraped twice before a flush keeps only its latest details
+        rows = list({row[0]: row for row in rows}.values())
 
-            if existing:
-                cursor.execute('''
-                    UPDATE vendor_product_management SET
-                        vendor_price = ?, product_name = ?, vendor_code = ?,
-                        vendor_product_sku = ?, vendor_img = ?, vendor_product_url = ?, prod_description = ?,
-                        vendor_price2 = ?, vendor_price3 = ?, vendor_price1_desc = ?, vendor_price2_desc = ?, vendor_price3_desc = ?,
+        try:
+            with self._transaction() as cursor:
+                cursor.executemany('UPDATE vendor_country_url_msts SET last_crawl_time = CURRENT_TIMESTAMP WHERE id = ?',
+                                   [(product_id,) for product_id in touched])
+
+                before = self.writer.total_changes
+                # Rows whose hash matches the stored one are left untouched by SQLite
+                cursor.executemany('''
+                    INSERT INTO vendor_product_management
+                    (pid, fg_vendor_price, cid, vid, vendor_price, product_name, vendor_code, vendor_product_sku, vendor_img, vendor_product_url, prod_description, vendor_price2, vendor_price3, vendor_price1_desc, vendor_price2_desc, vendor_price3_desc, action, flag, data_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(pid) DO UPDATE SET
+                        vendor_price = excluded.vendor_price, product_name = excluded.product_name, vendor_code = excluded.vendor_code,
+                        vendor_product_sku = excluded.vendor_product_sku, vendor_img = excluded.vendor_img,
+                        vendor_product_url = excluded.vendor_product_url, prod_description = excluded.prod_description,
+                        vendor_price2 = excluded.vendor_price2, vendor_price3 = excluded.vendor_price3,
+                        vendor_price1_desc = excluded.vendor_price1_desc, vendor_price2_desc = excluded.vendor_price2_desc,
+                        vendor_price3_desc = excluded.vendor_price3_desc, data_hash = excluded.data_hash,
                         updated_at = CURRENT_TIMESTAMP
-                    WHERE pid = ?
-                ''', (
-                    details.get('price_retail'),
-                    details.get('name'),
-                    details.get('vendor_code'),
-                    details.get('sku'),
-                    details.get('image_url'),
-                    product_url,
-                    details.get('description'),
-                    details.get('price_medium'),
-                    details.get('price_large'),
-                    'Retail',
-                    'Medium',
-                    'Large',
-                    product_id
-                ))
-                conn.commit()
-                return False, True
+                    WHERE vendor_product_management.data_hash IS NOT excluded.data_hash
+                ''', rows)
+                written = self.writer.total_changes - before
 
-            cursor.execute('''
-                INSERT INTO vendor_product_management
-                (pid, fg_vendor_price, cid, vid, vendor_price, product_name, vendor_code, vendor_product_sku, vendor_img, vendor_product_url, prod_description, vendor_price2, vendor_price3, vendor_price1_desc, vendor_price2_desc, vendor_price3_desc, action, flag)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                product_id,
-                '',
-                1,
-                1,
-                details.get('price_retail'),
-                details.get('name'),
-                details.get('vendor_code'),
-                details.get('sku'),
-                details.get('image_url'),
-                product_url,
-                details.get('description'),
-                details.get('price_medium'),
-                details.get('price_large'),
-                'Retail',
-                'Medium',
-                'Large',
-                '',
-                ''
-            ))
-
-            cursor.execute('UPDATE vendor_country_url_msts SET status = "inactive" WHERE id = ?', (product_id,))
-            conn.commit()
-            return True, True
+                cursor.executemany('UPDATE vendor_country_url_msts SET status = "inactive" WHERE id = ?',
+                                   [(row[0],) for row in rows])
 
+            counts = {'written': written, 'unchanged': len(rows) - written}
+            self._written_since_optimize += written
+            if self._written_since_optimize >= OPTIMIZE_EVERY:
+                # Keep planner statistics current during long runs
+                with self._lock:
+                    self.writer.execute('PRAGMA optimize')
+                self._written_since_optimize = 0
+            if rows:
+                logger.info(f"Flushed {len(rows)} products: {counts['written']} written, {counts['unchanged']} unchanged")
         except Exception as e:
-            logger.error(f"Error saving product details for product_id {product_id}: {e}")
-            return False, False
-        finally:
-            if conn:
-                conn.close()
+            logger.error(f"Error saving batch of {len(rows)} product details: {e}")
+        return counts
+
+    def mark_crawl_start(self, product_id: int) -> None:
+        """Queue a crawl-time stamp, written with the next details flush."""
+        self._touched.append(product_id)
+        if len(self._touched) >= self.batch_size:
+            self.flush_pending_details()
+
+    def log_scrape_error(self, product_id: int, product_url: str, error_type: str, error_message: str,
+                         retry_count: int = 0, flush: bool = False) -> None:
+        """Queue a scraping error; pass flush=True to write it out straight away."""
+        self._errors_buf.append((product_id, product_url, error_type, str(error_message)[:500], retry_count))
+        if flush or len(self._errors_buf) >= self.batch_size:
+            self.flush_errors()
 
-    def log_scrape_error(self, product_id: int, product_url: str, error_type: str, error_message: str, retry_count: int = 0) -> None:
-        """Log scraping errors."""
-        conn = None
+    def flush_errors(self) -> None:
+        """Insert all queued scraping errors in a single transaction."""
+        rows, self._errors_buf = self._errors_buf, []
+        if not rows:
+            return
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO scrape_errors (product_id, product_url, error_type, error_message, retry_count)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (product_id, product_url, error_type, str(error_message)[:500], retry_count))
-            conn.commit()
+            with self._transaction() as cursor:
+                cursor.executemany('''
+                    INSERT INTO scrape_errors (product_id, product_url, error_type, error_message, retry_count)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
         except Exception as e:
-            logger.warning(f"Could not log error for {product_url}: {e}")
-        finally:
-            if conn:
-                conn.close()
\ No newline at end of file
+            logger.warning(f"Could not log {len(rows)} scrape errors: {e}")
+
+    def get_database_stats(self) -> dict:
+        """Collect table counts, recent activity and an error breakdown in two queries."""
+        with self._read() as cursor:
+            cursor.execute('''
+                SELECT
+                    COUNT(*) AS total_urls,
+                    COUNT(*) FILTER (WHERE status = 'active') AS pending,
+                    COUNT(*) FILTER (WHERE status = 'inactive') AS processed,
+                    COUNT(*) FILTER (WHERE created_at >= datetime('now', '-1 day')) AS recently_discovered_urls,
+                    (SELECT COUNT(*) FROM vendor_product_management) AS total_details,
+                    (SELECT COUNT(*) FROM vendor_product_management WHERE updated_at >= datetime('now', '-1 day')) AS recently_updated,
+                    (SELECT COUNT(*) FROM scrape_errors) AS total_errors
+                FROM vendor_country_url_msts
+            ''')
+            row = cursor.fetchone()
+            stats = {column[0]: value for column, value in zip(cursor.description, row)}
+
+            # Grouped rows can't share the query above; idx_err_type serves this one
+            cursor.execute('SELECT error_type, COUNT(*) FROM scrape_errors GROUP BY error_type')
+            stats['errors_by_type'] = dict(cursor.fetchall())
+            return stats
+
+    def export_to_csv(self, filename: str) -> int:
+        """Export scraped products joined with their URLs to a CSV file."""
+        try:
+            import polars as pl
+        except ImportError:
+            pl = None
+
+        with self._read() as cursor:
+            if pl is not None:
+                # polars formats and writes the CSV natively, off the Python loop
+                df = pl.read_database(_EXPORT_QUERY, cursor.connection, infer_schema_length=None)
+                df.write_csv(filename)
+                count = df.height
+            else:
+                count = self._write_csv(cursor, filename)
+        logger.info(f"Exported {count} products to {filename}")
+        return count
+
+    def _write_csv(self, cursor: sqlite3.Cursor, filename: str) -> int:
+        """Stream the export query to CSV with the stdlib writer."""
+        count = 0
+        with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            cursor.execute(_EXPORT_QUERY)
+            writer = csv.writer(f)
+            writer.writerow([column[0] for column in cursor.description])
+            while True:
+                chunk = cursor.fetchmany(10000)
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                count += len(chunk)
+        return count
+
+    def export_to_parquet(self, filename: str) -> int:
+        """Stream scraped products to a zstd-compressed Parquet file (requires pyarrow)."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        count = 0
+        with self._read() as cursor:
+            cursor.execute(_EXPORT_QUERY)
+            schema = pa.schema(
+                [pa.field(cursor.description[0][0], pa.int64())]
+                + [pa.field(column[0], pa.string()) for column in cursor.description[1:]]
+            )
+            with pq.ParquetWriter(filename, schema, compression='zstd') as writer:
+                while True:
+                    chunk = cursor.fetchmany(10000)
+                    if not chunk:
+                        break
+                    columns = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+                    writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+                    count += len(chunk)
+        logger.info(f"Exported {count} products to {filename}")
+        return count
@@ -1,38 +1,254 @@
 import asyncio
+import functools
+import html
 import logging
-import json
+import multiprocessing
+import os
 import random
 import re
-import sqlite3
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
-from stealth_utils import apply_stealth
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+from itertools import islice
+from typing import Iterable
+import httpx
+from aiolimiter import AsyncLimiter
+import orjson
+from lxml import etree, html as lxml_html
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+from stealth_utils import apply_stealth, chrome_user_agents, launch_args, new_stealth_context
 
 logger = logging.getLogger(__name__)
 
+_PRICE_RE = re.compile(r'£(\d+(?:\.\d{2})?)')
+_LD_JSON_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+_OG_DESC_RE = re.compile(r'<meta\s[^>]*?property=["\']og:description["\'][^>]*>', re.IGNORECASE)
+_META_DESC_RE = re.compile(r'<meta\s[^>]*?name=["\']description["\'][^>]*>', re.IGNORECASE)
+_CONTENT_ATTR_RE = re.compile(r'\scontent=(["\'])(.*?)\1', re.DOTALL | re.IGNORECASE)
+_SKU_RE = re.compile(r'(?:SKU|Product Code)[:\s]*([A-Z0-9\-]+)', re.IGNORECASE)
+_DELIVERY_RE = re.compile(r'(?:Delivery|Shipping)[:\s]*(.+?)(?:\n|$)', re.IGNORECASE)
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one class token, like the CSS .name selector."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Compiled once; XPath evaluation runs in C rather than through soupsieve
+_XP_RETAIL = etree.XPath(f'//span[{_has_class("price-retail")}]')
+_XP_SIZE_COST = etree.XPath(f'//span[{_has_class("size-cost")}]')
+_XP_PRODUCT_ID = etree.XPath('//input[@id="productid"]/@value')
+_XP_NAME = etree.XPath(f'//h1[{_has_class("products-name")}]')
+_XP_TITLE = etree.XPath('//title')
+_XP_SKU_ATTR = etree.XPath('//*[@itemprop="sku" or @data-sku]')
+_XP_SKU_CLASS = etree.XPath('//*[contains(@class, "sku")]')
+_XP_DELIVERY = etree.XPath(
+    f'//div[{_has_class("delivery-info")}] | //*[{_has_class("shipping-info")}] | //*[{_has_class("delivery-details")}]'
+)
+_XP_BODY = etree.XPath('//body')
+
+# Page text for the SKU/delivery fallbacks breaks lines only at these elements, on both
+# fetch paths, so inline markup like <strong> never splits a sentence
+_BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+})
+_SKIP_TAGS = frozenset({'script', 'style', 'template'})
+
+def _raw_block_text(node, parts: list) -> None:
+    """Collect node's text into parts, with a newline around every block element."""
+    if node.text:
+        parts.append(node.text)
+    for child in node:
+        # Comments and processing instructions have a non-string tag; only their tail is text
+        if isinstance(child.tag, str) and child.tag not in _SKIP_TAGS:
+            block = child.tag in _BLOCK_TAGS
+            if block:
+                parts.append('\n')
+            _raw_block_text(child, parts)
+            if block:
+                parts.append('\n')
+        if child.tail:
+            parts.append(child.tail)
+
+def _block_lines(raw: str) -> str:
+    """Collapse whitespace within each line and drop the empty ones."""
+    lines = (' '.join(line.split()) for line in raw.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+# Pulls only what the extractors read out of the live DOM, mirroring _page_pieces,
+# so the browser path never serialises and ships the whole page back over CDP
+_PAGE_PIECES_JS = """() => {
+    const q = (sel) => document.querySelector(sel);
+    const joinStripped = (el) => {
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        const parts = [];
+        while (walker.nextNode()) parts.push(walker.currentNode.nodeValue.trim());
+        return parts.join('');
+    };
+    // Same walk as _raw_block_text, so both fetch paths see identical fallback text
+    const blockTags = new Set(BLOCK_TAGS);
+    const skipTags = new Set(SKIP_TAGS);
+    const blockText = (root) => {
+        const parts = [];
+        const walk = (node) => {
+            for (let child = node.firstChild; child; child = child.nextSibling) {
+                if (child.nodeType === Node.TEXT_NODE) {
+                    parts.push(child.nodeValue);
+                } else if (child.nodeType === Node.ELEMENT_NODE && !skipTags.has(child.localName)) {
+                    const block = blockTags.has(child.localName);
+                    if (block) parts.push('\\n');
+                    walk(child);
+                    if (block) parts.push('\\n');
+                }
+            }
+        };
+        walk(root);
+        return parts.join('');
+    };
+    const desc = q('meta[property="og:description"]') || q('meta[name="description"]');
+    const heading = q('h1.products-name') || q('title');
+    const retail = q('span.price-retail');
+    const skuAttr = q('[itemprop="sku"], [data-sku]');
+    const skuClass = q('[class*="sku"]');
+    const delivery = q('div.delivery-info, .shipping-info, .delivery-details');
+    const productId = q('input#productid');
+    const skuValue = skuAttr ? (skuAttr.getAttribute('content') || skuAttr.getAttribute('data-sku') || skuAttr.textContent.trim()) : null;
+    return {
+        ld_json: Array.from(document.querySelectorAll('script[type="application/ld+json"]'), (s) => s.textContent),
+        description: desc ? (desc.getAttribute('content') || '') : '',
+        retail: retail ? retail.textContent : null,
+        size_costs: Array.from(document.querySelectorAll('span.size-cost'), (s) => s.textContent).slice(0, 2),
+        product_id: productId ? (productId.getAttribute('value') || '') : '',
+        heading: heading ? heading.textContent : null,
+        sku_attr: skuValue,
+        sku_text: skuClass ? skuClass.textContent : null,
+        delivery: delivery ? joinStripped(delivery) : null,
+        // The page text is only needed for the SKU/delivery fallbacks
+        body_text: skuValue && delivery ? '' : (document.body ? blockText(document.body) : ''),
+    };
+}""".replace(
+    'BLOCK_TAGS', orjson.dumps(sorted(_BLOCK_TAGS)).decode()
+).replace(
+    'SKIP_TAGS', orjson.dumps(sorted(_SKIP_TAGS)).decode()
+)
+
+MAX_ATTEMPTS = 4
+MAX_RETRY_AFTER = 60
+PRODUCE_CHUNK = 500  # Pending rows read per trip to the database thread
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with jitter for the given zero-based attempt."""
+    return 2 ** attempt + random.random()
+
+def _retry_after(headers) -> float:
+    """Seconds to wait from a Retry-After header, capped, or None if absent/unparseable."""
+    value = headers.get('retry-after')
+    if value and value.strip().isdigit():
+        return min(float(value), MAX_RETRY_AFTER)
+    return None
+
+def parse_all(html_content: str) -> dict:
+    """Run every extractor over raw HTML; top-level so a process pool can pickle it."""
+    return DetailScraper._extract_all(html_content)
+
 class DetailScraper:
     """Scrape detailed product information from individual pages."""
 
-    def __init__(self, db):
+    def __init__(self, db, concurrency: int = 8, browser=None, rotate_every: int = 50, requests_per_second: int = 5):
         self.db = db
+        self.concurrency = concurrency
+        self.browser = browser
+        # Shared token bucket: caps page requests to the site across every worker
+        self.limiter = AsyncLimiter(requests_per_second, 1)
+        # Products per worker context before it's replaced with a fresh UA/viewport
+        self.rotate_every = rotate_every
+        self._stack = None
+        self._pool = None
+
+    async def __aenter__(self):
+        """Start the parse pool, and launch a browser for the scraper's lifetime unless one was injected."""
+        stack = AsyncExitStack()
+        try:
+            # Parsing holds the GIL, so spread it over processes rather than threads. Forking
+            # this threaded process (with open SQLite handles) is unsafe, so use a forkserver.
+            pool = ProcessPoolExecutor(
+                max_workers=min(self.concurrency, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+            stack.callback(setattr, self, '_pool', None)
+            stack.callback(pool.shutdown, cancel_futures=True)
+            self._pool = pool
+            if self.browser is None:
+                p = await stack.enter_async_context(async_playwright())
+                browser = await p.chromium.launch(headless=True, args=launch_args)
+                stack.callback(setattr, self, 'browser', None)
+                stack.push_async_callback(browser.close)
+                self.browser = browser
+        except BaseException:
+            await stack.aclose()
+            raise
+        # Only a fully set-up scraper counts as entered
+        self._stack = stack
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Shut down the parse pool, and close the browser if this scraper launched it."""
+        if self._stack is not None:
+            stack, self._stack = self._stack, None
+            await stack.aclose()
+
+    async def fetch_static_page(self, client: httpx.AsyncClient, url: str) -> str:
+        """Fetch server-rendered HTML over plain HTTP, or None if a browser is needed."""
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                async with self.limiter:
+                    response = await client.get(url)
+            except httpx.TransportError as e:
+                logger.debug(f"Static fetch attempt {attempt+1} failed for {url}: {e}")
+                if attempt < MAX_ATTEMPTS - 1:
+                    await asyncio.sleep(_backoff(attempt))
+                continue
+            except httpx.HTTPError as e:
+                logger.debug(f"Static fetch failed for {url}: {e}")
+                return None
+
+            content = response.text
+            if "cf-browser-verification" in content or "<title>Just a moment" in content:
+                logger.debug(f"Static fetch hit a challenge for {url}")
+                return None
+            if response.status_code in (429, 503) and attempt < MAX_ATTEMPTS - 1:
+                delay = _retry_after(response.headers) or _backoff(attempt)
+                logger.info(f"Got {response.status_code} for {url}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            break
+        else:
+            return None
 
-    async def wait_for_network_idle(self, page):
-        """Wait for network to be idle."""
-        await page.wait_for_load_state('networkidle')
+        if response.status_code != 200:
+            logger.debug(f"Static fetch returned {response.status_code} for {url}")
+            return None
+        if not _LD_JSON_RE.search(content):
+            logger.debug(f"No JSON-LD in static HTML for {url}")
+            return None
+        return content
 
-    async def fetch_product_page(self, page, url: str) -> str:
-        """Fetch product page with stealth."""
-        ua = random.choice([
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
-        ])
-        await page.set_extra_http_headers({
-            'User-Agent': ua,
-        })
+    async def fetch_product_page(self, page, url: str) -> dict:
+        """Fetch product page with stealth and return the pieces the extractors need."""
+        async with self.limiter:
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+        if response is not None and response.status == 429:
+            delay = _retry_after(response.headers)
+            logger.warning(f"Rate limited on {url}" + (f", waiting {delay:.0f}s" if delay else ""))
+            if delay:
+                await asyncio.sleep(delay)
+            return None
 
-        await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-        await page.wait_for_timeout(random.randint(3000, 8000))  # Randomized wait
+        # Fast path: a rendered product heading means there's no challenge to inspect
+        try:
+            await page.wait_for_selector('h1.products-name', timeout=2000)
+            return await self._read_pieces(page)
+        except PlaywrightTimeoutError:
+            pass
 
         # Check for JSON-LD
         try:
@@ -42,8 +258,7 @@ class DetailScraper:
 
         # Enhanced Cloudflare check
         title = await page.title()
-        content = await page.content()
-        if "just a moment" in title.lower() or "cf-browser-verification" in content or await page.locator('div.cf-challenge').is_visible():
+        if "just a moment" in title.lower() or await page.locator('.cf-browser-verification, #cf-browser-verification').count() or await page.locator('div.cf-challenge').is_visible():
             await page.wait_for_timeout(random.randint(10000, 20000))
             title = await page.title()
             if "just a moment" in title.lower():
@@ -53,110 +268,110 @@ class DetailScraper:
                 except:
                     logger.warning(f"Could not wait for h1 on {url}, continuing anyway")
 
-        content = await page.content()
-        title = await page.title()
-        if "just a moment" in title.lower():
-            logger.warning(f"Page still on challenge for {url}, skipping")
-            return None
-        return content
-
-    def extract_structured_json(self, html_content: str) -> dict:
-        """Extract JSON-LD structured data."""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        scripts = soup.find_all('script', type='application/ld+json')
-
-        for script in scripts:
+            title = await page.title()
+            if "just a moment" in title.lower():
+                logger.warning(f"Page still on challenge for {url}, skipping")
+                return None
+        return await self._read_pieces(page)
+
+    async def _read_pieces(self, page) -> dict:
+        """Evaluate the extractor inputs in the page instead of reading its full HTML."""
+        pieces = await page.evaluate(_PAGE_PIECES_JS)
+        body_text = _block_lines(pieces['body_text'])
+        pieces['body_text'] = lambda: body_text
+        return pieces
+
+    @staticmethod
+    def extract_structured_json(payloads: Iterable[str]) -> dict:
+        """Return the first Product object among raw JSON-LD payloads."""
+        for payload in payloads:
+            # Breadcrumb/Organization blocks never carry the product, skip parsing them
+            if '"Product"' not in payload:
+                continue
             try:
-                data = json.loads(script.string)
+                data = orjson.loads(payload)
                 if isinstance(data, list):
                     for item in data:
                         if item.get('@type') == 'Product':
                             return item
                 elif data.get('@type') == 'Product':
                     return data
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 continue
         return {}
 
-    def extract_og_description(self, html_content: str) -> str:
-        """Extract description from meta tags."""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        meta_tag = soup.find('meta', property='og:description')
-        if meta_tag:
-            return meta_tag.get('content', '')
-        meta_tag = soup.find('meta', attrs={'name': 'description'})
-        if meta_tag:
-            return meta_tag.get('content', '')
+    @staticmethod
+    def extract_og_description(html_content: str) -> str:
+        """Extract description from meta tags in the raw HTML."""
+        for tag_re in (_OG_DESC_RE, _META_DESC_RE):
+            tag = tag_re.search(html_content)
+            if tag:
+                content = _CONTENT_ATTR_RE.search(tag.group(0))
+                return html.unescape(content.group(2)) if content else ''
         return ''
 
-    def extract_prices(self, soup: BeautifulSoup) -> dict:
-        """Extract pricing using exact selectors."""
+    @staticmethod
+    def extract_prices(retail_text: str, size_cost_texts: list) -> dict:
+        """Extract pricing from the retail and size-cost price texts."""
         prices = {'price_retail': None, 'price_medium': None, 'price_large': None}
         
         # Exact selector for retail price
-        retail_elem = soup.select_one('span.price-retail')
-        if retail_elem:
-            match = re.search(r'£(\d+(?:\.\d{2})?)', retail_elem.get_text())
+        if retail_text:
+            match = _PRICE_RE.search(retail_text)
             if match:
                 prices['price_retail'] = float(match.group(1))
         
-        # Exact selectors for size costs
-        size_costs = soup.select('span.size-cost')
-        for i, cost_elem in enumerate(size_costs[:2]):  # Limit to medium/large
-            match = re.search(r'£(\d+(?:\.\d{2})?)', cost_elem.get_text())
-            if match and prices['price_retail']:
-                cost = float(match.group(1))
-                if i == 0:
-                    prices['price_medium'] = prices['price_retail'] + cost
-                elif i == 1:
-                    prices['price_large'] = prices['price_retail'] + cost
+        # Exact selectors for size costs, priced on top of retail
+        retail = prices['price_retail']
+        if retail:
+            search = _PRICE_RE.search
+            sizes = [None, None]
+            for i, cost_text in enumerate(size_cost_texts[:2]):  # Limit to medium/large
+                match = search(cost_text)
+                if match:
+                    sizes[i] = retail + float(match.group(1))
+            prices['price_medium'], prices['price_large'] = sizes
         
         return prices
 
-    def extract_product_id(self, soup: BeautifulSoup) -> str:
-        """Extract product ID using exact selector."""
-        productid_input = soup.select_one('input#productid')
-        if productid_input:
-            return productid_input.get('value', '')
-        return ''
-
-    def extract_name(self, soup: BeautifulSoup, structured_json: dict) -> str:
+    @staticmethod
+    def extract_name(heading: str, structured_json: dict) -> str:
         """Extract product name with fallbacks."""
         name = structured_json.get('name', '')
-        if not name:
-            h1 = soup.select_one('h1.products-name')
-            if h1:
-                name = h1.get_text().strip()
-            else:
-                title = soup.find('title')
-                if title:
-                    name = title.get_text().strip()
+        if not name and heading:
+            name = heading.strip()
         return name
 
-    def extract_sku(self, soup: BeautifulSoup, structured_json: dict) -> str:
+    @staticmethod
+    def extract_sku(pieces: dict, structured_json: dict) -> str:
         """Extract SKU with fallbacks."""
-        sku = structured_json.get('sku', '')
+        # Microdata and data attributes before falling back to the page text
+        sku = structured_json.get('sku', '') or pieces['sku_attr'] or ''
+        if not sku and pieces['sku_text']:
+            match = _SKU_RE.search(' '.join(pieces['sku_text'].split()))
+            sku = match.group(1) if match else ''
         if not sku:
-            # Search for SKU or Product Code
-            text = soup.get_text()
-            match = re.search(r'(?:SKU|Product Code)[:\s]*([A-Z0-9\-]+)', text, re.I)
+            match = _SKU_RE.search(pieces['body_text']())
             if match:
                 sku = match.group(1)
         return sku
 
-    def extract_image_url(self, structured_json: dict) -> str:
+    @staticmethod
+    def extract_image_url(structured_json: dict) -> str:
         """Extract image URL from JSON-LD."""
         image = structured_json.get('image', [None])[0] if isinstance(structured_json.get('image'), list) else structured_json.get('image')
         return image or ''
 
-    def extract_rating(self, structured_json: dict) -> float:
+    @staticmethod
+    def extract_rating(structured_json: dict) -> float:
         """Extract rating from JSON-LD."""
         aggregate_rating = structured_json.get('aggregateRating', {})
         if isinstance(aggregate_rating, dict):
             return aggregate_rating.get('ratingValue')
         return None
 
-    def extract_availability(self, structured_json: dict) -> str:
+    @staticmethod
+    def extract_availability(structured_json: dict) -> str:
         """Extract availability from JSON-LD."""
         offers = structured_json.get('offers', {})
         if isinstance(offers, dict):
@@ -165,75 +380,123 @@ class DetailScraper:
             return offers[0].get('availability')
         return None
 
-    def extract_delivery_info(self, soup: BeautifulSoup) -> str:
+    @staticmethod
+    def extract_delivery_info(pieces: dict) -> str:
         """Extract delivery info from page content."""
         # Look for common delivery selectors
-        delivery_div = soup.select_one('div.delivery-info, .shipping-info, .delivery-details')
-        if delivery_div:
-            return delivery_div.get_text(strip=True)
+        if pieces['delivery'] is not None:
+            return pieces['delivery']
         # Fallback to text search
-        text = soup.get_text()
-        match = re.search(r'(?:Delivery|Shipping)[:\s]*(.+?)(?:\n|$)', text, re.I)
+        match = _DELIVERY_RE.search(pieces['body_text']())
         if match:
             return match.group(1).strip()
         return ''
 
-    async def scrape_product_details(self, page, product_id: int, product_url: str) -> dict:
-        """Scrape details from a product page."""
+    @staticmethod
+    def _page_pieces(html_content: str) -> dict:
+        """Parse raw HTML once and pull out the pieces the extractors read."""
+        tree = lxml_html.fromstring(html_content)
+        sku_elems = _XP_SKU_ATTR(tree)
+        sku_class_elems = _XP_SKU_CLASS(tree)
+        delivery_elems = _XP_DELIVERY(tree)
+        heading_elems = _XP_NAME(tree) or _XP_TITLE(tree)
+        retail_elems = _XP_RETAIL(tree)
+        product_ids = _XP_PRODUCT_ID(tree)
+        sku_attr = None
+        if sku_elems:
+            elem = sku_elems[0]
+            sku_attr = elem.get('content') or elem.get('data-sku') or elem.text_content().strip()
+        return {
+            'ld_json': [match.group(1) for match in _LD_JSON_RE.finditer(html_content)],
+            'description': DetailScraper.extract_og_description(html_content),
+            'retail': retail_elems[0].text_content() if retail_elems else None,
+            'size_costs': [elem.text_content() for elem in _XP_SIZE_COST(tree)[:2]],
+            'product_id': product_ids[0] if product_ids else '',
+            'heading': heading_elems[0].text_content() if heading_elems else None,
+            'sku_attr': sku_attr,
+            'sku_text': sku_class_elems[0].text_content() if sku_class_elems else None,
+            'delivery': ''.join(t.strip() for t in delivery_elems[0].itertext()) if delivery_elems else None,
+            # Only walked if a SKU or delivery fallback needs it, then reused
+            'body_text': functools.cache(lambda: DetailScraper._body_text(tree)),
+        }
+
+    @staticmethod
+    def _body_text(tree) -> str:
+        """Return the page's body text, lines broken only at block elements."""
+        bodies = _XP_BODY(tree)
+        if not bodies:
+            return ''
+        parts = []
+        _raw_block_text(bodies[0], parts)
+        return _block_lines(''.join(parts))
+
+    @staticmethod
+    def _details_from_pieces(pieces: dict) -> dict:
+        """Run every extractor over one page's pieces and return the details dict."""
+        structured_json = DetailScraper.extract_structured_json(pieces['ld_json'])
+        prices = DetailScraper.extract_prices(pieces['retail'], pieces['size_costs'])
+        name = DetailScraper.extract_name(pieces['heading'], structured_json)
+        sku = DetailScraper.extract_sku(pieces, structured_json)
+        image_url = DetailScraper.extract_image_url(structured_json)
+        rating = DetailScraper.extract_rating(structured_json)
+        availability = DetailScraper.extract_availability(structured_json)
+        delivery_info = DetailScraper.extract_delivery_info(pieces)
+
+        return {
+            'vendor_code': pieces['product_id'] or '',
+            'sku': sku,
+            'name': name,
+            'description': pieces['description'] or '',
+            'price_retail': prices['price_retail'],
+            'price_medium': prices['price_medium'],
+            'price_large': prices['price_large'],
+            'image_url': image_url,
+            'rating': rating,
+            'availability': availability,
+            'delivery_info': delivery_info,
+            'structured_json': structured_json
+        }
+
+    @staticmethod
+    def _extract_all(html_content: str) -> dict:
+        """Parse one page of raw HTML and return the details dict."""
+        return DetailScraper._details_from_pieces(DetailScraper._page_pieces(html_content))
+
+    async def scrape_product_details(self, get_page, product_id: int, product_url: str, client: httpx.AsyncClient = None) -> dict:
+        """Scrape details from a product page, opening a browser page via get_page only when plain HTTP isn't enough."""
         logger.info(f"Scraping details: {product_url}")
 
-        for attempt in range(3):
-            try:
-                html_content = await self.fetch_product_page(page, product_url)
-                if html_content:
-                    break
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
-            except Exception as e:
-                logger.error(f"Attempt {attempt+1} failed for {product_url}: {e}")
-        else:
-            self.db.log_scrape_error(product_id, product_url, 'MaxRetries', 'Failed after 3 attempts')
-            return {}
-
+        pieces = None
+        html_content = await self.fetch_static_page(client, product_url) if client else None
         if not html_content:
+            # Fall back to the browser for challenged or JS-rendered pages
+            for attempt in range(MAX_ATTEMPTS):
+                try:
+                    pieces = await self.fetch_product_page(await get_page(), product_url)
+                    if pieces:
+                        break
+                except Exception as e:
+                    logger.error(f"Attempt {attempt+1} failed for {product_url}: {e}")
+                if attempt < MAX_ATTEMPTS - 1:
+                    await asyncio.sleep(_backoff(attempt))
+            else:
+                self.db.log_scrape_error(product_id, product_url, 'MaxRetries', f'Failed after {MAX_ATTEMPTS} attempts', retry_count=MAX_ATTEMPTS - 1)
+                return {}
+
+        if not html_content and not pieces:
             self.db.log_scrape_error(product_id, product_url, 'FetchError', 'Could not fetch page')
             return {}
 
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            structured_json = self.extract_structured_json(html_content)
-            description = self.extract_og_description(html_content)
-            prices = self.extract_prices(soup)
-            vendor_code = self.extract_product_id(soup)
-            name = self.extract_name(soup, structured_json)
-            sku = self.extract_sku(soup, structured_json)
-            image_url = self.extract_image_url(structured_json)
-            rating = self.extract_rating(structured_json)
-            availability = self.extract_availability(structured_json)
-            delivery_info = self.extract_delivery_info(soup)
-
-            details = {
-                'vendor_code': vendor_code,
-                'sku': sku,
-                'name': name,
-                'description': description,
-                'price_retail': prices['price_retail'],
-                'price_medium': prices['price_medium'],
-                'price_large': prices['price_large'],
-                'image_url': image_url,
-                'rating': rating,
-                'availability': availability,
-                'delivery_info': delivery_info,
-                'structured_json': structured_json
-            }
-
-            is_inserted, has_changed = self.db.save_product_details(product_id, product_url, details)
-
-            if is_inserted:
-                logger.info(f"NEW: {name} | £{prices['price_retail']}")
-            elif has_changed:
-                logger.info(f"UPDATED: {name} | £{prices['price_retail']}")
+            if html_content:
+                # Parsing is CPU-bound; a worker process keeps it off the event loop and the GIL
+                details = await asyncio.get_running_loop().run_in_executor(self._pool, parse_all, html_content)
             else:
-                logger.info(f"NO CHANGE: {name}")
+                # The browser already did the DOM work, only the cheap field logic is left
+                details = DetailScraper._details_from_pieces(pieces)
+
+            self.db.save_product_details(product_id, product_url, details)
+            logger.info(f"SCRAPED: {details['name']} | £{details['price_retail']}")
 
             return details
         except Exception as e:
@@ -241,54 +504,121 @@ class DetailScraper:
             logger.error(f"Error extracting from {product_url}: {e}")
             return {}
 
-    async def scrape_all_pending_products(self, limit: int = None) -> dict:
-        """Scrape all pending products."""
-        products = self.db.get_pending_products(limit)
-
-        logger.info(f"Starting scrape of {len(products)} products")
-
-        successful = 0
-        failed = 0
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            ua = random.choice([
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
-            ])
-            viewport = {'width': random.randint(1024, 1920), 'height': random.randint(768, 1080)}
-            context = await browser.new_context(
-                user_agent=ua,
-                viewport=viewport
-            )
-            page = await context.new_page()
-            await apply_stealth(page)
-
-            for idx, (product_id, product_url) in enumerate(products, 1):
-                logger.info(f"[{idx}/{len(products)}] Processing: {product_url}")
-
-                # Update last_checked
-                conn = sqlite3.connect(self.db.db_path, timeout=10)
-                cursor = conn.cursor()
-                cursor.execute('UPDATE vendor_country_url_msts SET last_crawl_time = CURRENT_TIMESTAMP WHERE id = ?', (product_id,))
-                conn.commit()
-                conn.close()
+    async def _new_page(self, browser):
+        """Open a fresh stealth context and page for one worker."""
+        context = await new_stealth_context(browser)
+        page = await context.new_page()
+        await apply_stealth(page)
+        return context, page
+
+    async def _worker(self, queue: asyncio.Queue, browser, client: httpx.AsyncClient, total: int, results: dict) -> None:
+        """Pull products off the queue and scrape them on this worker's own page."""
+        context = page = None
+        handled = 0
+
+        async def get_page():
+            """Open this worker's context on first use, replacing it every rotate_every products."""
+            nonlocal context, page, handled
+            # handled already counts the product asking for the page
+            if context is not None and handled > self.rotate_every:
+                stale, context = context, None
+                await stale.close()
+            if context is None:
+                context, page = await self._new_page(browser)
+                handled = 1
+            return page
 
+        try:
+            while True:
+                idx, (product_id, product_url) = await queue.get()
+                logger.info(f"[{idx}/{total}] Processing: {product_url}")
                 try:
-                    details = await self.scrape_product_details(page, product_id, product_url)
+                    handled += 1
+                    self.db.mark_crawl_start(product_id)
+
+                    details = await self.scrape_product_details(get_page, product_id, product_url, client)
                     if details:
-                        successful += 1
+                        results['successful'] += 1
                     else:
-                        failed += 1
+                        results['failed'] += 1
                 except Exception as e:
                     logger.error(f"Error: {e}")
-                    self.db.log_scrape_error(product_id, product_url, type(e).__name__, str(e))
-                    failed += 1
-
-                await asyncio.sleep(random.uniform(1.5, 4.0))  # Randomized rate limiting
-
-            await browser.close()
+                    # Unexpected failures are written out at once rather than batched
+                    self.db.log_scrape_error(product_id, product_url, type(e).__name__, str(e), flush=True)
+                    results['failed'] += 1
+                finally:
+                    queue.task_done()
+        finally:
+            if context is not None:
+                await context.close()
+
+    async def _produce(self, queue: asyncio.Queue, limit: int = None) -> None:
+        """Feed pending products into the queue, reading them off the event loop in chunks."""
+        # If cancelled, the generator is closed on collection and hands its reader back
+        rows = self.db.iter_pending_products(limit)
+        idx = 0
+        while True:
+            chunk = await asyncio.to_thread(list, islice(rows, PRODUCE_CHUNK))
+            if not chunk:
+                break
+            for product in chunk:
+                idx += 1
+                await queue.put((idx, product))
+
+    async def _unless_workers_fail(self, awaitable, workers: list):
+        """Await awaitable, raising instead if a worker task exits first."""
+        task = asyncio.ensure_future(awaitable)
+        done, _ = await asyncio.wait({task, *workers}, return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            return task.result()
+        task.cancel()
+        # Workers loop until cancelled, so any finished worker has failed
+        for worker in done:
+            worker.result()
+        raise RuntimeError('Detail worker exited early')
 
-        logger.info(f"Scrape complete: {successful} successful, {failed} failed")
-        return {'total': len(products), 'successful': successful, 'failed': failed}
\ No newline at end of file
+    async def scrape_all_pending_products(self, limit: int = None) -> dict:
+        """Scrape all pending products with a pool of concurrent workers."""
+        total = self.db.count_pending(limit)
+
+        logger.info(f"Starting scrape of {total} products with {self.concurrency} workers")
+
+        results = {'successful': 0, 'failed': 0}
+        if not total:
+            return {'total': 0, **results}
+
+        # Bounded so workers start on the first rows while the rest are still being read
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        client = httpx.AsyncClient(
+            http2=True,
+            headers={'User-Agent': random.choice(chrome_user_agents)},
+            limits=httpx.Limits(max_connections=32),
+            timeout=30,
+            follow_redirects=True
+        )
+        async with client, AsyncExitStack() as stack:
+            if self._stack is None:
+                # Not entered with `async with`: start the parse pool (and a browser) for this run only
+                await stack.enter_async_context(self)
+            browser = self.browser
+
+            # Every product hits the same host, so the worker count is the per-host bound
+            workers = [
+                asyncio.create_task(self._worker(queue, browser, client, total, results))
+                for _ in range(min(self.concurrency, total))
+            ]
+            producer = asyncio.create_task(self._produce(queue, limit))
+            try:
+                # Neither the producer nor join() can finish if every worker has died, so watch them too
+                await self._unless_workers_fail(producer, workers)
+                await self._unless_workers_fail(queue.join(), workers)
+            finally:
+                for task in (producer, *workers):
+                    task.cancel()
+                await asyncio.gather(producer, *workers, return_exceptions=True)
+                self.db.flush_pending_details()
+                self.db.flush_errors()
+
+        logger.info(f"Scrape complete: {results['successful']} successful, {results['failed']} failed")
+        return {'total': total, **results}
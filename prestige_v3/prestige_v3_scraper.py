@@ -1,13 +1,20 @@
 import asyncio
 import os
 import logging
-import nest_asyncio
+from playwright.async_api import async_playwright
 from database import Database
 from url_scraper import URLScraper
 from detail_scraper import DetailScraper
+from stealth_utils import launch_args
 
-# Apply nest_asyncio
-nest_asyncio.apply()
+# nest_asyncio patches the event loop in pure Python, so only apply it inside a Jupyter/IPython kernel
+try:
+    from IPython import get_ipython
+except ImportError:
+    get_ipython = None
+if get_ipython is not None and get_ipython() is not None:
+    import nest_asyncio
+    nest_asyncio.apply()
 
 # Logging
 logging.basicConfig(
@@ -23,31 +30,114 @@ logger = logging.getLogger(__name__)
 # Environment variables
 DB_PATH = os.getenv('SCRAPER_DB_PATH', 'prestige_flowers_v3.db')
 CATEGORY_URL = os.getenv('SCRAPER_CATEGORY_URL', 'https://www.prestigeflowers.co.uk/christmas-plants')
+CATEGORY_URLS = [url.strip() for url in os.getenv('SCRAPER_CATEGORY_URLS', CATEGORY_URL).split(',') if url.strip()]
+CATEGORY_WORKERS = int(os.getenv('SCRAPER_CATEGORY_WORKERS', '1'))
+RUN_INTERVAL = int(os.getenv('SCRAPER_RUN_INTERVAL', '0'))
 STEALTH_ENABLED = os.getenv('SCRAPER_STEALTH_ENABLED', 'true').lower() == 'true'
-RATE_LIMIT = int(os.getenv('SCRAPER_RATE_LIMIT', '2'))
+CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', '8'))
+CONTEXT_ROTATE_EVERY = int(os.getenv('SCRAPER_CONTEXT_ROTATE_EVERY', '50'))
+REQUESTS_PER_SECOND = int(os.getenv('SCRAPER_REQUESTS_PER_SECOND', '5'))
+CSV_FILENAME = os.getenv('SCRAPER_CSV_FILENAME', 'prestige_flowers_v3.csv')
+PARQUET_FILENAME = os.getenv('SCRAPER_PARQUET_FILENAME', 'prestige_flowers_v3.parquet')
+OUTPUT_FORMAT = os.getenv('SCRAPER_OUTPUT_FORMAT', 'csv').lower()
+
+def export_results(db: Database) -> None:
+    """Export scraped products in the configured format and log database stats."""
+    if OUTPUT_FORMAT == 'parquet':
+        db.export_to_parquet(PARQUET_FILENAME)
+    else:
+        db.export_to_csv(CSV_FILENAME)
+
+    logger.info(f"Database stats: {db.get_database_stats()}")
+
+async def category_worker(browser, category_queue: asyncio.Queue, db: Database, detail_scraper: DetailScraper,
+                          details_lock: asyncio.Lock):
+    """Scrape categories from the queue, reusing the already-launched browser and one category page."""
+    async with URLScraper(db, browser=browser) as url_scraper:
+        while True:
+            category_url = await category_queue.get()
+            try:
+                # Step 1: Scrape product URLs from category
+                urls = await url_scraper.scrape_category_urls(category_url)
+                logger.info(f"Scraped {len(urls)} URLs from {category_url}")
+
+                # Step 2: Scrape product details. Pending products are shared across
+                # categories, so only one worker runs this (internally parallel) stage at a time.
+                async with details_lock:
+                    results = await detail_scraper.scrape_all_pending_products()
+                logger.info(f"Results for {category_url}: {results}")
+            except Exception as e:
+                logger.error(f"Error scraping category {category_url}: {e}")
+            finally:
+                category_queue.task_done()
+
+async def scheduler_loop(category_queue: asyncio.Queue, db: Database, browser):
+    """Queue every category, export when the pass is done, and repeat every RUN_INTERVAL seconds."""
+    while True:
+        # Every pass reuses the one browser; fail loudly rather than run a pass that can only fail
+        if not browser.is_connected():
+            raise RuntimeError("Browser disconnected between passes, stopping the scraper")
+        if RUN_INTERVAL > 0:
+            # Scraped products go inactive; re-check those older than one interval so changes are picked up
+            reactivated = db.reactivate_stale(RUN_INTERVAL)
+            logger.info(f"Re-checking {reactivated} products last crawled over {RUN_INTERVAL}s ago")
+        for category_url in CATEGORY_URLS:
+            category_queue.put_nowait(category_url)
+        await category_queue.join()
+
+        logger.info("Scraping complete")
+        db.optimize()
+        # Step 3: Export
+        export_results(db)
+
+        if RUN_INTERVAL <= 0:
+            return
+        logger.info(f"Next pass in {RUN_INTERVAL}s")
+        await asyncio.sleep(RUN_INTERVAL)
 
 async def main():
     """Main scraper function."""
     logger.info("Starting Prestige V3 Scraper")
     logger.info(f"DB Path: {DB_PATH}")
-    logger.info(f"Category URL: {CATEGORY_URL}")
+    logger.info(f"Category URLs: {CATEGORY_URLS}")
     logger.info(f"Stealth Enabled: {STEALTH_ENABLED}")
-    logger.info(f"Rate Limit: {RATE_LIMIT}s")
+    logger.info(f"Concurrency: {CONCURRENCY}")
+    logger.info(f"Requests per second: {REQUESTS_PER_SECOND}")
+    logger.info(f"Run Interval: {RUN_INTERVAL}s" if RUN_INTERVAL > 0 else "Run Interval: single pass")
 
     # Initialize database
     db = Database(DB_PATH)
+    category_queue = asyncio.Queue()
+    details_lock = asyncio.Lock()
 
-    # Step 1: Scrape product URLs from category
-    url_scraper = URLScraper(db)
-    urls = await url_scraper.scrape_category_urls(CATEGORY_URL)
-    logger.info(f"Scraped {len(urls)} URLs")
-
-    # Step 2: Scrape product details
-    detail_scraper = DetailScraper(db)
-    results = await detail_scraper.scrape_all_pending_products()
-
-    logger.info("Scraping complete")
-    logger.info(f"Results: {results}")
+    try:
+        # Launch the browser once and share it across every pass and worker
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=launch_args)
+            try:
+                # One detail scraper (and so one parse pool and request limiter) for every worker;
+                # details_lock already keeps its runs from overlapping
+                async with DetailScraper(db, concurrency=CONCURRENCY, browser=browser, rotate_every=CONTEXT_ROTATE_EVERY,
+                                         requests_per_second=REQUESTS_PER_SECOND) as detail_scraper:
+                    workers = [
+                        asyncio.create_task(category_worker(browser, category_queue, db, detail_scraper, details_lock))
+                        for _ in range(CATEGORY_WORKERS)
+                    ]
+                    try:
+                        await scheduler_loop(category_queue, db, browser)
+                    finally:
+                        for worker in workers:
+                            worker.cancel()
+                        await asyncio.gather(*workers, return_exceptions=True)
+            finally:
+                await browser.close()
+    finally:
+        db.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,4 +1,5 @@
 import random
+from urllib.parse import urlsplit
 from playwright_stealth import Stealth
 
 user_agents = [
@@ -9,16 +10,54 @@ user_agents = [
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/120.0',
 ]
 
+# Chromium's client hints and TLS fingerprint give away a Firefox UA, so Chromium traffic only uses these
+chrome_user_agents = [ua for ua in user_agents if 'Chrome/' in ua]
+
+# Resource types the scrapers never read; skipping them cuts most of a page's bytes
+blocked_resource_types = {'image', 'media', 'font', 'stylesheet'}
+
+# Analytics and ad hosts, matched on the request host and its parent domains
+blocked_hosts = (
+    'googletagmanager.com', 'google-analytics.com', 'doubleclick.net',
+    'facebook.net', 'hotjar.com',
+)
+
+def _is_blocked_host(url: str) -> bool:
+    """Check whether a request URL points at a blocked tracker host."""
+    host = urlsplit(url).hostname or ''
+    return any(host == blocked or host.endswith('.' + blocked) for blocked in blocked_hosts)
+
+async def _route_request(route):
+    """Abort requests for blocked resource types and trackers, let everything else through."""
+    request = route.request
+    if request.resource_type in blocked_resource_types or _is_blocked_host(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def block_heavy_resources(context):
+    """Skip images, media, fonts, stylesheets and trackers on every page in the context."""
+    await context.route('**/*', _route_request)
+
+# Chromium flags for every launch; stops navigator.webdriver being set by Blink itself
+launch_args = ['--disable-blink-features=AutomationControlled']
+
+async def new_stealth_context(browser):
+    """Open a context with a random user agent and viewport and heavy resources blocked."""
+    context = await browser.new_context(
+        user_agent=random.choice(chrome_user_agents),
+        viewport={'width': random.randint(1024, 1920), 'height': random.randint(768, 1080)},
+        reduced_motion='reduce'
+    )
+    await block_heavy_resources(context)
+    return context
+
 async def apply_stealth(page):
     """Apply enhanced stealth plugins to evade detection."""
     stealth = Stealth()
     await stealth.apply_stealth_async(page)  # Use playwright-stealth for comprehensive evasion
     
-    # Randomize user agent and viewport
-    ua = random.choice(user_agents)
-    await page.set_extra_http_headers({'User-Agent': ua})
-    viewport = {'width': random.randint(1024, 1920), 'height': random.randint(768, 1080)}
-    await page.set_viewport_size(viewport)
+    # User agent and viewport are randomized per context by new_stealth_context
     
     # Additional custom stealth
     await page.add_init_script("""
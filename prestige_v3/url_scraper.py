@@ -1,121 +1,123 @@
 import asyncio
 import logging
 import random
-from bs4 import BeautifulSoup
+from contextlib import AsyncExitStack
+from urllib.parse import urlparse
+from lxml import etree, html as lxml_html
 from playwright.async_api import async_playwright
-from stealth_utils import apply_stealth
+from stealth_utils import apply_stealth, launch_args, new_stealth_context
 
 logger = logging.getLogger(__name__)
 
+_PRODUCT_LINKS = 'a.product-img[href]'
+_HREFS_JS = '(els) => els.map(e => e.getAttribute("href"))'
+_XP_CATEGORY_HREFS = etree.XPath('//a[starts-with(@href, "/christmas-plants/")]/@href')
+
 class URLScraper:
     """Scrape product URLs from category pages."""
 
-    def __init__(self, db):
+    def __init__(self, db, browser=None):
         self.db = db
+        self.browser = browser
+        self._stack = None
+        self._context = None
+        self._page = None
 
-    async def wait_for_network_idle(self, page):
-        """Wait for network to be idle."""
-        await page.wait_for_load_state('networkidle')
+    async def __aenter__(self):
+        """Launch a browser for the scraper's lifetime unless one was injected."""
+        if self.browser is None:
+            self._stack = AsyncExitStack()
+            p = await self._stack.enter_async_context(async_playwright())
+            self.browser = await p.chromium.launch(headless=True, args=launch_args)
+            self._stack.push_async_callback(self.browser.close)
+        return self
 
-import asyncio
-import logging
-import random
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
-from stealth_utils import apply_stealth
+    async def __aexit__(self, *exc_info) -> None:
+        """Close the reused context, and the browser if this scraper launched it."""
+        if self._context is not None:
+            context, self._context, self._page = self._context, None, None
+            await context.close()
+        if self._stack is not None:
+            stack, self._stack = self._stack, None
+            self.browser = None
+            await stack.aclose()
 
-logger = logging.getLogger(__name__)
+    async def fetch_page(self, url: str) -> list:
+        """Fetch product URLs from a category page, reusing the browser and page across calls."""
+        if self.browser is None:
+            # Not entered with `async with`: launch a browser for this call only
+            async with self:
+                return await self._collect_urls(url)
+        return await self._collect_urls(url)
 
-class URLScraper:
-    """Scrape product URLs from category pages."""
-
-    def __init__(self, db):
-        self.db = db
+    async def _get_page(self):
+        """Return the scraper's stealth page, opening its context on first use."""
+        if self._page is None:
+            self._context = await new_stealth_context(self.browser)
+            self._page = await self._context.new_page()
+            await apply_stealth(self._page)
+        return self._page
 
-    async def wait_for_network_idle(self, page):
-        """Wait for network to be idle."""
-        await page.wait_for_load_state('networkidle')
-
-    async def fetch_page(self, url: str) -> str:
-        """Fetch page content with stealth and anti-bot measures."""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            ua = random.choice([
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
-            ])
-            viewport = {'width': random.randint(1024, 1920), 'height': random.randint(768, 1080)}
-            context = await browser.new_context(
-                user_agent=ua,
-                viewport=viewport
-            )
-            page = await context.new_page()
-            await apply_stealth(page)
-            
-            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-            await page.wait_for_timeout(random.randint(3000, 8000))  # Randomized wait
-            
-            # Enhanced Cloudflare check
+    async def _collect_urls(self, url: str) -> list:
+        """Load a category page on the reused page and collect product links."""
+        page = await self._get_page()
+        await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+        
+        # Enhanced Cloudflare check
+        title = await page.title()
+        if "Just a moment" in title or await page.locator('.cf-browser-verification, #cf-browser-verification').count() or await page.locator('div.cf-challenge').is_visible():
+            await page.wait_for_timeout(random.randint(10000, 20000))
             title = await page.title()
-            content = await page.content()
-            if "Just a moment" in title or "cf-browser-verification" in content or await page.locator('div.cf-challenge').is_visible():
-                await page.wait_for_timeout(random.randint(10000, 20000))
-                title = await page.title()
-                if "Just a moment" in title:
-                    logger.warning(f"Challenge persistent for {url}, skipping")
-                    await browser.close()
-                    return []
-            
-            try:
-                await self.wait_for_network_idle(page)
-            except:
-                pass  # Fallback if idle not reached
-            
-            # Wait for product links with retry
-            try:
-                await page.wait_for_selector('a.product-img', timeout=15000)
-            except:
-                logger.debug(f"Product links selector not found for {url}")
-            
-            content = await page.content()
-            logger.info(f"Page title: {await page.title()}")
-            # Extract URLs using Playwright
-            links = page.locator('a')
-            count = await links.count()
-            urls = []
-            for i in range(count):
-                href = await links.nth(i).get_attribute('href')
-                if href:
-                    if href.startswith('http'):
-                        full_url = href
-                    elif href.startswith('/'):
-                        full_url = f"https://www.prestigeflowers.co.uk{href}"
-                    else:
-                        continue
-                    if '/christmas-plants/' in full_url and full_url != 'https://www.prestigeflowers.co.uk/christmas-plants/':
-                        urls.append(full_url)
-            urls = list(set(urls))
-            logger.info(f"Found {len(urls)} links")
-            await browser.close()
-            return urls
+            if "Just a moment" in title:
+                logger.warning(f"Challenge persistent for {url}, skipping")
+                return []
+        
+        # Wait for product links rather than network idle, which ad-heavy pages rarely reach
+        try:
+            await page.wait_for_selector(_PRODUCT_LINKS, state='attached', timeout=15000)
+        except:
+            logger.debug(f"Product links selector not found for {url}")
+        
+        logger.info(f"Page title: {await page.title()}")
+        # Product links live under the category path on the same host
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        category_path = parts.path.rstrip('/') + '/'
+        # Pull every href in one round-trip instead of one per link. Product tiles are
+        # a.product-img; fall back to every link if the listing markup changes.
+        hrefs = await page.eval_on_selector_all(_PRODUCT_LINKS, _HREFS_JS)
+        if not hrefs:
+            hrefs = await page.eval_on_selector_all('a[href]', _HREFS_JS)
+        urls = []
+        seen = set()
+        for href in hrefs:
+            if href:
+                if href.startswith('http'):
+                    full_url = href
+                elif href.startswith('/'):
+                    full_url = f"{origin}{href}"
+                else:
+                    continue
+                if category_path in full_url and full_url != f"{origin}{category_path}" and full_url not in seen:
+                    seen.add(full_url)
+                    urls.append(full_url)
+        logger.info(f"Found {len(urls)} links")
+        return urls
 
     def extract_product_urls(self, html_content: str) -> list:
         """Extract product URLs using exact selectors."""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        urls = []
-        for a in soup.select('a[href^="/christmas-plants/"]'):
-            href = a.get('href')
-            if href and href != '/christmas-plants/':  # exclude the category itself
-                full_url = f"https://www.prestigeflowers.co.uk{href}"
-                urls.append(full_url)
-        return list(set(urls))  # unique
+        tree = lxml_html.fromstring(html_content)
+        urls = (
+            f"https://www.prestigeflowers.co.uk{href}"
+            for href in _XP_CATEGORY_HREFS(tree)
+            if href != '/christmas-plants/'  # exclude the category itself
+        )
+        return list(dict.fromkeys(urls))  # unique, in page order
 
     async def scrape_category_urls(self, category_url: str) -> list:
         """Scrape and save product URLs from category page."""
         logger.info(f"Scraping URLs from {category_url}")
         urls = await self.fetch_page(category_url)
-        for url in urls:
-            self.db.save_product_url(url)
-        logger.info(f"Scraped {len(urls)} URLs")
+        counts = self.db.save_product_urls(urls)
+        logger.info(f"Scraped {len(urls)} URLs: {counts['inserted']} new, {counts['skipped']} already known")
         return urls
\ No newline at end of file